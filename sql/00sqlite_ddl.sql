@@ -8,6 +8,9 @@ DROP TABLE IF EXISTS fact_sales;
 DROP TABLE IF EXISTS dim_branch;
 DROP TABLE IF EXISTS dim_product_line;
 DROP TABLE IF EXISTS stg_sales_raw;
+DROP TRIGGER IF EXISTS trg_fact_sales_delete_drops_hash_snapshot;
+DROP TRIGGER IF EXISTS trg_fact_sales_rehash_drops_hash_snapshot;
+DROP TABLE IF EXISTS meta_fact_hash_snapshot;
 
 DROP TABLE IF EXISTS bronze_sales_raw;
 CREATE TABLE bronze_sales_raw (
@@ -32,6 +35,31 @@ CREATE TABLE bronze_sales_raw (
     extracted_at TEXT NOT NULL
 );
 
+-- Quarantine: rows rejected by the pre-load quality gate (src/quality.py)
+DROP TABLE IF EXISTS quarantine_sales_raw;
+CREATE TABLE quarantine_sales_raw (
+    row_hash TEXT,
+    invoice_id TEXT,
+    branch TEXT,
+    city TEXT,
+    customer_type TEXT,
+    gender TEXT,
+    product_line TEXT,
+    unit_price REAL,
+    quantity INTEGER,
+    tax_5_percent REAL,
+    total REAL,
+    date TEXT,
+    time TEXT,
+    payment TEXT,
+    cogs REAL,
+    gross_margin_percentage REAL,
+    gross_income REAL,
+    rating REAL,
+    reason_codes TEXT NOT NULL,
+    extracted_at TEXT NOT NULL
+);
+
 -- Dimension: Product Line (Type 1)
 CREATE TABLE IF NOT EXISTS silver_dim_product_line (
     product_line_key INTEGER PRIMARY KEY,
@@ -75,3 +103,74 @@ CREATE TABLE IF NOT EXISTS silver_fact_sales (
     FOREIGN KEY(branch_key) REFERENCES silver_dim_branch(branch_key)
 );
 
+-- Gold: mergeable sketches per branch x day (src/sketches.py), folded in during fact load
+CREATE TABLE IF NOT EXISTS gold_sales_sketch_daily (
+    branch_code TEXT NOT NULL,
+    txn_date TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    invoice_hll BLOB NOT NULL,
+    total_quantiles TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (branch_code, txn_date)
+);
+
+-- Per-table mutation counter (src/run_state.py table_generation). Deletes and
+-- updates bump it, so a delete plus insert that keeps COUNT(*) and MAX(rowid)
+-- still changes the stage fingerprints. Inserts are seen through COUNT/MAX.
+CREATE TABLE IF NOT EXISTS meta_table_mutations (
+    table_name TEXT PRIMARY KEY,
+    mutations INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_dim_product_line_delete_mutation
+AFTER DELETE ON silver_dim_product_line
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_dim_product_line', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_dim_product_line_update_mutation
+AFTER UPDATE ON silver_dim_product_line
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_dim_product_line', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_dim_branch_delete_mutation
+AFTER DELETE ON silver_dim_branch
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_dim_branch', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_dim_branch_update_mutation
+AFTER UPDATE ON silver_dim_branch
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_dim_branch', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_fact_sales_delete_mutation
+AFTER DELETE ON silver_fact_sales
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_fact_sales', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_silver_fact_sales_update_mutation
+AFTER UPDATE ON silver_fact_sales
+BEGIN
+    INSERT INTO meta_table_mutations(table_name, mutations) VALUES ('silver_fact_sales', 1)
+    ON CONFLICT(table_name) DO UPDATE SET mutations = mutations + 1;
+END;
+
+-- Run-state ledger (created separately by src/run_state.py; survives bronze rebuilds)
+CREATE TABLE IF NOT EXISTS meta_pipeline_run_state (
+    stage TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    input_fingerprint TEXT,
+    outputs TEXT,
+    error TEXT,
+    started_at TEXT,
+    completed_at TEXT
+);
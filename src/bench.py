@@ -0,0 +1,320 @@
+import csv
+import logging
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Sequence
+
+import pandas as pd
+
+from . import db
+from .schema_sql import DDL_SQLITE
+from .transform_load import (
+    CSV_PARSE_ENGINES,
+    _normalize_columns,
+    _parse_date_iso,
+    _row_hash,
+    read_raw_csv,
+    read_source_csv,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Peak RSS of this process. On Linux, VmHWM is used because ru_maxrss keeps the
+# high-water mark of the parent the worker was spawned from.
+def _maxrss_bytes() -> int:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+# Runs in a fresh process per engine: peak RSS and the Arrow pool peak see the
+# Arrow buffers that tracemalloc misses (pandas 3 strings are Arrow-backed in both engines)
+def _memory_probe(csv_path: str, engine: str) -> dict[str, Any]:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+
+    rss_before = _maxrss_bytes()
+    read_raw_csv(Path(csv_path), engine=engine)
+    return {
+        "rss_peak_bytes": _maxrss_bytes() - rss_before,
+        "arrow_pool_peak_bytes": pa.default_memory_pool().max_memory() if pa is not None else None,
+    }
+
+
+# Copy of the first rows with one rating that fails its declared type and totals
+# in non-canonical text ("21.00"), to exercise the Arrow per-column text fallback
+def _write_bad_value_sample(csv_path: Path, out_path: Path, rows: int = 1000) -> None:
+    with open(csv_path, newline="", encoding="utf-8") as src, open(out_path, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        writer.writerow(header)
+        total_idx = next((i for i, h in enumerate(header) if h in ("Total", "Sales")), None)
+        rating_idx = header.index("Rating") if "Rating" in header else None
+        for n, row in enumerate(reader):
+            if n >= rows:
+                break
+            if total_idx is not None and row[total_idx]:
+                row[total_idx] = f"{float(row[total_idx]):.2f}"
+            if n == 0 and rating_idx is not None:
+                row[rating_idx] = "n/a"
+            writer.writerow(row)
+
+
+def _all_row_hashes(csv_path: Path, engine: str) -> set[str]:
+    frames = read_raw_csv(csv_path, engine=engine)
+    hashes = set(frames.raw["row_hash"])
+    if "row_hash" in frames.quarantine.columns:
+        hashes |= set(frames.quarantine["row_hash"])
+    return hashes
+
+
+def _reference_row_hashes(csv_path: Path) -> set[str]:
+    df = _normalize_columns(pd.read_csv(csv_path))
+    if "date" in df.columns:
+        df["date"] = _parse_date_iso(df["date"])
+    return set(df.apply(_row_hash, axis=1))
+
+
+# Time the raw parse and the full read_raw_csv per engine, size the result,
+# and check the engines agree on row_hash, on the file and on a bad-value sample
+def bench_read_raw_csv(
+    csv_path: Path,
+    *,
+    engines: Sequence[str] = CSV_PARSE_ENGINES,
+    repeat: int = 3,
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    baseline_hashes = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bad_sample = Path(tmp) / "bad_value_sample.csv"
+        _write_bad_value_sample(csv_path, bad_sample)
+        bad_reference = _reference_row_hashes(bad_sample)
+
+        spawn = multiprocessing.get_context("spawn")
+        for engine in engines:
+            parse_timings: list[float] = []
+            timings: list[float] = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                read_source_csv(csv_path, engine=engine)
+                parse_timings.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                read_raw_csv(csv_path, engine=engine)
+                timings.append(time.perf_counter() - started)
+
+            # Separate traced run: tracemalloc distorts timings (and does not see Arrow buffers)
+            tracemalloc.start()
+            try:
+                df = read_raw_csv(csv_path, engine=engine).raw
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            with spawn.Pool(1) as pool:
+                memory = pool.apply(_memory_probe, (str(csv_path), engine))
+
+            hashes = set(df["row_hash"])
+            if baseline_hashes is None:
+                baseline_hashes = hashes
+
+            results.append(
+                {
+                    "engine": engine,
+                    "rows": len(df),
+                    "parse_best_s": min(parse_timings),
+                    "best_s": min(timings),
+                    "mean_s": sum(timings) / len(timings),
+                    "frame_bytes": int(df.memory_usage(deep=True).sum()),
+                    "py_peak_bytes": peak_bytes,
+                    **memory,
+                    "row_hash_parity": hashes == baseline_hashes,
+                    "bad_value_row_hash_parity": _all_row_hashes(bad_sample, engine) == bad_reference,
+                }
+            )
+
+    return results
+
+
+def log_results(results: list[dict[str, Any]]) -> None:
+    base = results[0]["parse_best_s"] if results else 0.0
+    for r in results:
+        logger.info(
+            "%-8s rows=%d parse=%.3fs (x%.2f) read_raw_csv best=%.3fs mean=%.3fs "
+            "frame=%.1f MiB py_peak=%.1f MiB rss_peak=+%.1f MiB arrow_pool_peak=%s "
+            "row_hash_parity=%s bad_value_parity=%s",
+            r["engine"],
+            r["rows"],
+            r["parse_best_s"],
+            base / r["parse_best_s"] if r["parse_best_s"] else 0.0,
+            r["best_s"],
+            r["mean_s"],
+            r["frame_bytes"] / 2**20,
+            r["py_peak_bytes"] / 2**20,
+            r["rss_peak_bytes"] / 2**20,
+            "n/a" if r["arrow_pool_peak_bytes"] is None else f"{r['arrow_pool_peak_bytes'] / 2**20:.1f} MiB",
+            r["row_hash_parity"],
+            r["bad_value_row_hash_parity"],
+        )
+
+
+# Modules the light CLI commands must not pull in at startup
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "kaggle")
+
+STARTUP_COMMANDS = {
+    "validate": ["validate", "--mode", "full"],
+    "report": ["report", "03"],
+}
+
+
+def _imported_top_level_modules(importtime_stderr: str) -> set[str]:
+    modules: set[str] = set()
+    for line in importtime_stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name and name != "imported package":
+                modules.add(name.split(".")[0])
+    return modules
+
+
+# Cumulative -X importtime of the project's own top-level imports (src.cli and the
+# modules its command imports lazily), stdlib and third-party imports included.
+# Unlike wall time it leaves out interpreter startup and process spawn noise.
+def _src_import_ms(importtime_stderr: str) -> float:
+    total_us = 0
+    for line in importtime_stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            _, cumulative, name = line.split("|")
+            top_level = not name.startswith("  ")
+            module = name.strip()
+            if top_level and (module == "src" or module.startswith("src.")) and cumulative.strip().isdigit():
+                total_us += int(cumulative)
+    return total_us / 1000.0
+
+
+# Run the light CLI commands in fresh interpreters against an empty schema and
+# check import time and wall time against their budgets and that no heavy
+# module was imported
+def bench_cli_startup(
+    *, budget_ms: float = 250.0, import_budget_ms: float = 150.0, repeat: int = 3
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    repo_root = Path(__file__).resolve().parents[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "startup.sqlite"
+        conn = db.connect(db_path)
+        try:
+            db.execute_script(conn, DDL_SQLITE)
+        finally:
+            conn.close()
+
+        env = {**os.environ, "SQLITE_DB_PATH": str(db_path), "DATA_DIR": tmp, "LOG_LEVEL": "WARNING"}
+        for name, argv in STARTUP_COMMANDS.items():
+            cmd = [sys.executable, "-X", "importtime", "-m", "src", *argv]
+            timings: list[float] = []
+            import_timings: list[float] = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                proc = subprocess.run(cmd, cwd=repo_root, env=env, capture_output=True, text=True)
+                timings.append((time.perf_counter() - started) * 1000.0)
+                import_timings.append(_src_import_ms(proc.stderr))
+            stderr = proc.stderr
+            # validate exits 1 on the empty schema by design; a traceback means it never got that far
+            crashed = "Traceback (most recent call last)" in stderr
+
+            heavy = sorted(_imported_top_level_modules(stderr) & set(HEAVY_MODULES))
+            best_ms = min(timings)
+            import_ms = min(import_timings)
+            results.append(
+                {
+                    "command": " ".join(argv),
+                    "best_ms": best_ms,
+                    "budget_ms": budget_ms,
+                    "import_ms": import_ms,
+                    "import_budget_ms": import_budget_ms,
+                    "heavy_imports": heavy,
+                    "returncode": proc.returncode,
+                    "crashed": crashed,
+                    "ok": best_ms <= budget_ms and import_ms <= import_budget_ms and not heavy and not crashed,
+                }
+            )
+
+    return results
+
+
+def log_startup_results(results: list[dict[str, Any]]) -> None:
+    for r in results:
+        log = logger.info if r["ok"] else logger.error
+        log(
+            "%-12s best=%.0fms budget=%.0fms imports=%.0fms budget=%.0fms heavy_imports=%s rc=%d%s %s",
+            r["command"],
+            r["best_ms"],
+            r["budget_ms"],
+            r["import_ms"],
+            r["import_budget_ms"],
+            ",".join(r["heavy_imports"]) or "-",
+            r["returncode"],
+            " (crashed)" if r["crashed"] else "",
+            "OK" if r["ok"] else "FAIL",
+        )
+
+
+# Rebuild the columnar snapshot, check parity with the SQL reports and time both engines
+def bench_columnar(db_path: Path, out_dir: Path, sql_dir: Path) -> list[str]:
+    from . import columnar
+
+    conn = db.connect(db_path)
+    try:
+        started = time.perf_counter()
+        snapshot = columnar.snapshot_fact_columns(conn, out_dir)
+        logger.info("snapshot built in %.3fs", time.perf_counter() - started)
+
+        for prefix, (method, _) in sorted(columnar.REPORTS.items()):
+            sql_file = next(sql_dir.glob(f"{prefix}.*.sql"))
+            sql = sql_file.read_text(encoding="utf-8")
+
+            started = time.perf_counter()
+            db.fetch_all(conn, sql)
+            sql_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            getattr(snapshot, method)()
+            col_s = time.perf_counter() - started
+
+            logger.info("%-40s sql=%.3fs columnar=%.3fs (x%.1f)", method, sql_s, col_s, sql_s / col_s if col_s else 0.0)
+
+        problems = columnar.verify_against_sql(conn, snapshot, sql_dir)
+    finally:
+        conn.close()
+
+    for problem in problems:
+        logger.error("columnar mismatch: %s", problem)
+    if not problems:
+        logger.info("columnar engine matches SQL for all reports")
+    return problems
+
+
+if __name__ == "__main__":
+    from .logging_utils import configure_logging
+
+    configure_logging("INFO")
+    log_results(bench_read_raw_csv(Path(sys.argv[1])))
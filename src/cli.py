@@ -0,0 +1,213 @@
+import argparse
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+# Only stdlib and light src modules at import time: pandas, numpy, pyarrow,
+# python-dotenv and the Kaggle client are imported inside the commands that use them.
+from .config import load_settings
+from .logging_utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+
+
+def _report_files() -> list[Path]:
+    return sorted(p for p in SQL_DIR.glob("*.sql") if not p.name.startswith("00"))
+
+
+def _select_reports(names: Sequence[str]) -> list[Path]:
+    files = _report_files()
+    if not names:
+        return files
+    chosen: list[Path] = []
+    for name in names:
+        matches = [p for p in files if p.name.startswith(name) or name.lower() in p.name.lower()]
+        if not matches:
+            raise SystemExit(f"No report matches {name!r}; use `report --list`")
+        chosen.extend(m for m in matches if m not in chosen)
+    return chosen
+
+
+def _print_rows(title: str, columns: Sequence[str], rows: Sequence[Sequence]) -> None:
+    print(f"-- {title}")
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+    print()
+
+
+def cmd_extract(args: argparse.Namespace) -> int:
+    from .extract import extract_latest_dataset, find_first_csv
+
+    settings = load_settings()
+    extracted_dir = extract_latest_dataset(dataset=settings.kaggle_dataset, output_dir=settings.data_dir / "raw")
+    print(find_first_csv(extracted_dir))
+    return 0
+
+
+def cmd_load(args: argparse.Namespace) -> int:
+    from .extract import find_first_csv
+    from .runner import run_pipeline
+
+    csv_path = args.csv
+    try:
+        if csv_path is None:
+            csv_path = find_first_csv(load_settings().data_dir / "raw")
+        elif not csv_path.is_file():
+            raise FileNotFoundError(f"CSV not found at: {csv_path}")
+    except FileNotFoundError as e:
+        logger.error("%s", e)
+        return 1
+
+    run_pipeline(csv_path=csv_path.resolve(), engine=args.engine, run_validation=not args.skip_validation)
+    return 0
+
+
+def cmd_validate(args: argparse.Namespace) -> int:
+    from . import db, run_state
+    from .validate import validate_sqlite_db
+
+    db_path = args.db or load_settings().sqlite_db_path
+    since_sales_key = args.since_sales_key
+
+    # Without an explicit watermark, delta mode scopes to the last load recorded in the
+    # ledger. Read-only: a DB without the ledger table has no watermark (full mode).
+    if since_sales_key is None and args.mode != "full" and db_path.exists():
+        conn = db.connect(db_path)
+        try:
+            fact = run_state.get_stage(conn, "fact")
+        except sqlite3.OperationalError:
+            fact = None
+        finally:
+            conn.close()
+        if fact is not None:
+            since_sales_key = fact.outputs.get("sales_key_watermark")
+
+    try:
+        validate_sqlite_db(db_path, mode=args.mode, since_sales_key=since_sales_key)
+    except (RuntimeError, FileNotFoundError) as e:
+        logger.error("Validation failed: %s", e)
+        return 1
+    return 0
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    if args.list:
+        for p in _report_files():
+            print(p.name)
+        return 0
+
+    reports = _select_reports(args.names)
+    settings = load_settings()
+
+    if args.engine == "columnar":
+        from . import columnar
+
+        snapshot = columnar.ColumnarSnapshot.open(args.snapshot or settings.data_dir / "columnar")
+        for p in reports:
+            spec = columnar.REPORTS.get(p.name[:2])
+            if spec is None:
+                logger.warning("No columnar implementation for %s; skipping", p.name)
+                continue
+            method, columns = spec
+            _print_rows(p.name, columns, getattr(snapshot, method)())
+        return 0
+
+    from . import db
+
+    db_path = args.db or settings.sqlite_db_path
+    if not db_path.exists():
+        logger.error("SQLite DB not found at: %s", db_path)
+        return 1
+    conn = db.connect(db_path)
+    try:
+        for p in reports:
+            cur = conn.execute(p.read_text(encoding="utf-8"))
+            _print_rows(p.name, [d[0] for d in cur.description], cur.fetchall())
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    from . import bench
+
+    if args.target == "csv":
+        bench.log_results(bench.bench_read_raw_csv(args.path, repeat=args.repeat))
+        return 0
+
+    if args.target == "startup":
+        results = bench.bench_cli_startup(budget_ms=args.budget_ms, import_budget_ms=args.import_budget_ms)
+        bench.log_startup_results(results)
+        return 0 if all(r["ok"] for r in results) else 1
+
+    settings = load_settings()
+    problems = bench.bench_columnar(
+        args.db or settings.sqlite_db_path,
+        settings.data_dir / "columnar",
+        SQL_DIR,
+    )
+    return 1 if problems else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src", description="Supermarket sales pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="download the latest Kaggle dataset and print the CSV path")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("load", help="load a CSV into bronze/silver (checkpointed)")
+    p.add_argument("--csv", type=Path, help="CSV to load (default: largest CSV under DATA_DIR/raw)")
+    p.add_argument("--engine", choices=("pandas", "arrow"), help="CSV parse engine (default: CSV_PARSE_ENGINE)")
+    p.add_argument("--skip-validation", action="store_true", help="do not run the validate stage")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("validate", help="run data quality checks")
+    p.add_argument("--db", type=Path, help="SQLite DB (default: SQLITE_DB_PATH)")
+    p.add_argument("--mode", choices=("delta", "full"), help="delta: last load only; full: whole history")
+    p.add_argument("--since-sales-key", type=int, help="delta watermark (default: from the run-state ledger)")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("report", help="run the sql/ reports")
+    p.add_argument("names", nargs="*", help="report number or name fragment (default: all)")
+    p.add_argument("--list", action="store_true", help="list available reports")
+    p.add_argument("--engine", choices=("sql", "columnar"), default="sql")
+    p.add_argument("--db", type=Path, help="SQLite DB (default: SQLITE_DB_PATH)")
+    p.add_argument("--snapshot", type=Path, help="columnar snapshot dir (default: DATA_DIR/columnar)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("bench", help="benchmarks")
+    bench_sub = p.add_subparsers(dest="target", required=True)
+    b = bench_sub.add_parser("csv", help="compare CSV parse engines")
+    b.add_argument("path", type=Path)
+    b.add_argument("--repeat", type=int, default=3)
+    b = bench_sub.add_parser("startup", help="check validate/report startup time and lazy imports")
+    b.add_argument("--budget-ms", type=float, default=250.0, help="wall time per command")
+    b.add_argument("--import-budget-ms", type=float, default=150.0, help="-X importtime of the src modules")
+    b = bench_sub.add_parser("columnar", help="columnar engine vs SQL: parity and timings")
+    b.add_argument("--db", type=Path, help="SQLite DB (default: SQLITE_DB_PATH)")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    configure_logging(load_settings().log_level)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into e.g. `head`; silence the flush at interpreter exit
+        import os
+
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+import json
+import logging
+import math
+import shutil
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+FACT_COLUMNS = ("branch", "product_line", "day", "total", "quantity", "rating")
+META_FILE = "dims.json"
+
+# sql/ report number -> (ColumnarSnapshot method, output columns)
+REPORTS = {
+    "03": ("kpi_tiles", ("total_sales", "avg_basket", "transactions", "avg_quantity", "avg_rating")),
+    "11": ("daily_running_revenue_by_branch", ("branch_code", "txn_date", "day_revenue", "running_revenue")),
+    "12": (
+        "monthly_revenue_by_branch_product_line",
+        (
+            "year_month",
+            "branch_code",
+            "city",
+            "product_line_name",
+            "revenue",
+            "product_rank_in_branch_month",
+            "running_revenue_in_branch",
+        ),
+    ),
+    "13": ("mom_revenue_by_branch", ("branch_code", "year_month", "revenue", "prev_month_revenue")),
+    "14": (
+        "top3_product_lines_by_branch",
+        ("branch_code", "product_line_name", "revenue", "rev_rank", "branch_revenue_pct"),
+    ),
+}
+
+_FETCH_CHUNK = 200_000
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+# SQLite ROUND(x, 2) rounds half away from zero
+def _round2(x: Any) -> Optional[float]:
+    if x is None or (isinstance(x, float) and math.isnan(x)):
+        return None
+    return math.copysign(math.floor(abs(float(x)) * 100.0 + 0.5 + 1e-9) / 100.0, float(x))
+
+
+def _group_sum(keys: list[np.ndarray], sizes: list[int], values: np.ndarray) -> tuple[list[np.ndarray], np.ndarray]:
+    flat = np.ravel_multi_index(keys, sizes)
+    uniq, inverse = np.unique(flat, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(uniq))
+    return list(np.unravel_index(uniq, sizes)), sums
+
+
+# Snapshot of silver_fact_sales plus dimension keys as memory-mapped NumPy columns
+@dataclass(frozen=True)
+class ColumnarSnapshot:
+    path: Path
+    branch: np.ndarray  # int32 position into branch_codes/branch_cities/branch_is_current
+    product_line: np.ndarray  # int32 position into product_line_names
+    day: np.ndarray  # int32 days since 1970-01-01
+    total: np.ndarray
+    quantity: np.ndarray
+    rating: np.ndarray
+    branch_codes: list[str]
+    branch_cities: list[str]
+    branch_is_current: np.ndarray
+    product_line_names: list[str]
+    meta: dict[str, Any]
+
+    @classmethod
+    def open(cls, path: Path) -> "ColumnarSnapshot":
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        cols = {name: np.load(path / f"fact_{name}.npy", mmap_mode="r") for name in FACT_COLUMNS}
+        return cls(
+            path=path,
+            branch_codes=meta["branches"]["branch_code"],
+            branch_cities=meta["branches"]["city"],
+            branch_is_current=np.asarray(meta["branches"]["is_current"], dtype=bool),
+            product_line_names=meta["product_lines"],
+            meta=meta,
+            **cols,
+        )
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+    # Branch code index per fact row (several SCD2 rows share one code)
+    def _code_index(self) -> tuple[np.ndarray, list[str]]:
+        codes = sorted(set(self.branch_codes))
+        pos = {c: i for i, c in enumerate(codes)}
+        row_to_code = np.asarray([pos[c] for c in self.branch_codes], dtype=np.int32)
+        return row_to_code[self.branch], codes
+
+    def _months(self) -> tuple[np.ndarray, np.ndarray]:
+        months = np.asarray(self.day, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        base = int(months.min()) if len(months) else 0
+        return months - base, np.int64(base)
+
+    @staticmethod
+    def _month_label(offset: int, base: int) -> str:
+        return str(np.datetime64(int(base + offset), "M"))
+
+    def _current_mask(self) -> np.ndarray:
+        return self.branch_is_current[self.branch]
+
+    def _revenue(self) -> np.ndarray:
+        return np.nan_to_num(np.asarray(self.total, dtype=np.float64), nan=0.0)
+
+    # sql/03.KPI Dashboard (5 Tiles).sql
+    def kpi_tiles(self) -> list[tuple]:
+        n = len(self)
+        if n == 0:
+            return [(None, None, 0, None, None)]
+        total = np.asarray(self.total, dtype=np.float64)
+        total_sales = float(np.nansum(total))
+        return [
+            (
+                _round2(total_sales),
+                _round2(total_sales / n),
+                n,
+                _round2(np.nanmean(self.quantity)) if np.any(~np.isnan(self.quantity)) else None,
+                _round2(np.nanmean(self.rating)) if np.any(~np.isnan(self.rating)) else None,
+            )
+        ]
+
+    # sql/11.Running Revenue by Branch (Daily).sql
+    def daily_running_revenue_by_branch(self) -> list[tuple]:
+        code, codes = self._code_index()
+        mask = self._current_mask()
+        if not mask.any():
+            return []
+        day = np.asarray(self.day, dtype=np.int64)[mask]
+        base = int(day.min())
+        (code_idx, day_off), sums = _group_sum(
+            [code[mask], day - base], [len(codes), int(day.max()) - base + 1], self._revenue()[mask]
+        )
+
+        out: list[tuple] = []
+        running = 0.0
+        prev_code = None
+        for c, d, rev in zip(code_idx.tolist(), day_off.tolist(), sums.tolist()):
+            if c != prev_code:
+                running, prev_code = 0.0, c
+            running += rev
+            out.append((codes[c], str(np.datetime64(base + d, "D")), _round2(rev), _round2(running)))
+        return out
+
+    # sql/12.Monthly Revenue by Branch & Product Line.sql (all branch versions, ranked per month)
+    def monthly_revenue_by_branch_product_line(self) -> list[tuple]:
+        if len(self) == 0:
+            return []
+        month, base = self._months()
+        (month_idx, branch_idx, pl_idx), sums = _group_sum(
+            [month, np.asarray(self.branch), np.asarray(self.product_line)],
+            [int(month.max()) + 1, len(self.branch_codes), len(self.product_line_names)],
+            self._revenue(),
+        )
+
+        # SQL groups by (month, branch_code, city, product_line) and ranks per (month, branch_code)
+        groups: dict[tuple, float] = {}
+        for m, b, p, rev in zip(month_idx.tolist(), branch_idx.tolist(), pl_idx.tolist(), sums.tolist()):
+            key = (m, self.branch_codes[b], self.branch_cities[b], self.product_line_names[p])
+            groups[key] = groups.get(key, 0.0) + rev
+
+        by_partition: dict[tuple, list] = {}
+        for (m, code, city, pl), rev in groups.items():
+            by_partition.setdefault((m, code), []).append((rev, city, pl))
+
+        ranked: list[tuple] = []
+        for (m, code), items in by_partition.items():
+            items.sort(key=lambda t: (-t[0], t[2], t[1]))
+            rank = 0
+            prev_rev = None
+            for pos, (rev, city, pl) in enumerate(items, start=1):
+                if rev != prev_rev:
+                    rank, prev_rev = pos, rev
+                ranked.append((m, code, city, pl, rev, rank))
+
+        running: dict[str, float] = {}
+        out: list[tuple] = []
+        for m, code, city, pl, rev, rank in sorted(ranked, key=lambda t: (t[0], t[1], t[5], t[3])):
+            running[code] = running.get(code, 0.0) + rev
+            out.append((self._month_label(m, base), code, city, pl, rev, rank, running[code]))
+        return out
+
+    def _monthly_current_by_code(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str], np.int64]:
+        code, codes = self._code_index()
+        mask = self._current_mask()
+        month, base = self._months()
+        if not mask.any():
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), codes, base
+        (code_idx, month_idx), sums = _group_sum(
+            [code[mask], month[mask]], [len(codes), int(month.max()) + 1], self._revenue()[mask]
+        )
+        return code_idx, month_idx, sums, codes, base
+
+    # sql/13.Month-over-month revenue by branch.sql
+    def mom_revenue_by_branch(self) -> list[tuple]:
+        code_idx, month_idx, sums, codes, base = self._monthly_current_by_code()
+        out: list[tuple] = []
+        prev_code, prev_rev = None, None
+        for c, m, rev in zip(code_idx.tolist(), month_idx.tolist(), sums.tolist()):
+            if c != prev_code:
+                prev_code, prev_rev = c, None
+            revenue = _round2(rev)
+            out.append((codes[c], self._month_label(m, base), revenue, prev_rev))
+            prev_rev = revenue
+        return out
+
+    # sql/14.Top 3 Product Lines per Branch (Revenue Rank).sql
+    def top3_product_lines_by_branch(self) -> list[tuple]:
+        code, codes = self._code_index()
+        mask = self._current_mask()
+        if not mask.any():
+            return []
+        (code_idx, pl_idx), sums = _group_sum(
+            [code[mask], np.asarray(self.product_line)[mask]],
+            [len(codes), len(self.product_line_names)],
+            self._revenue()[mask],
+        )
+
+        per_branch: dict[int, list[tuple[float, str]]] = {}
+        for c, p, rev in zip(code_idx.tolist(), pl_idx.tolist(), sums.tolist()):
+            per_branch.setdefault(c, []).append((_round2(rev), self.product_line_names[p]))
+
+        out: list[tuple] = []
+        for c in sorted(per_branch):
+            items = sorted(per_branch[c], key=lambda t: (-t[0], t[1]))
+            branch_total = sum(rev for rev, _ in items)
+            rank = 0
+            prev_rev = None
+            for rev, pl in items:
+                if rev != prev_rev:
+                    rank, prev_rev = rank + 1, rev
+                if rank > 3:
+                    break
+                pct = _round2(100.0 * rev / branch_total) if branch_total else None
+                out.append((codes[c], pl, rev, rank, pct))
+        return out
+
+
+# Write silver_fact_sales and its dimension keys to out_dir as .npy columns.
+# Built in a sibling temp dir and swapped in, so readers never see a partial snapshot.
+def snapshot_fact_columns(conn: sqlite3.Connection, out_dir: Path) -> ColumnarSnapshot:
+    branches = db.fetch_all(
+        conn, "SELECT branch_key, branch_code, city, is_current FROM silver_dim_branch ORDER BY branch_key"
+    )
+    product_lines = db.fetch_all(
+        conn, "SELECT product_line_key, product_line_name FROM silver_dim_product_line ORDER BY product_line_key"
+    )
+    branch_pos = {key: i for i, (key, _, _, _) in enumerate(branches)}
+    pl_pos = {key: i for i, (key, _) in enumerate(product_lines)}
+
+    n_rows, max_key = db.fetch_all(conn, "SELECT COUNT(*), COALESCE(MAX(sales_key), 0) FROM silver_fact_sales")[0]
+
+    tmp_dir = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    dtypes = {"branch": np.int32, "product_line": np.int32, "day": np.int32}
+    cols = {
+        name: np.lib.format.open_memmap(tmp_dir / f"fact_{name}.npy", mode="w+", dtype=dtypes.get(name, np.float64), shape=(n_rows,))
+        for name in FACT_COLUMNS
+    }
+
+    logger.info("Snapshotting %d fact rows to columnar files at %s", n_rows, out_dir)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT branch_key, product_line_key, txn_date, total, quantity, rating
+        FROM silver_fact_sales
+        WHERE sales_key <= ?
+        ORDER BY sales_key
+        """,
+        (max_key,),
+    )
+    offset = 0
+    while True:
+        chunk = cur.fetchmany(_FETCH_CHUNK)
+        if not chunk:
+            break
+        branch_keys, pl_keys, dates, totals, quantities, ratings = zip(*chunk)
+        end = offset + len(chunk)
+        cols["branch"][offset:end] = [branch_pos[k] for k in branch_keys]
+        cols["product_line"][offset:end] = [pl_pos[k] for k in pl_keys]
+        cols["day"][offset:end] = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+        cols["total"][offset:end] = np.asarray(totals, dtype=np.float64)
+        cols["quantity"][offset:end] = np.asarray(quantities, dtype=np.float64)
+        cols["rating"][offset:end] = np.asarray(ratings, dtype=np.float64)
+        offset = end
+
+    for arr in cols.values():
+        arr.flush()
+    del cols
+
+    meta = {
+        "created_at": _utc_now_iso(),
+        "rows": offset,
+        "max_sales_key": int(max_key),
+        "branches": {
+            "branch_code": [r[1] for r in branches],
+            "city": [r[2] for r in branches],
+            "is_current": [bool(r[3]) for r in branches],
+        },
+        "product_lines": [r[1] for r in product_lines],
+    }
+    (tmp_dir / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+
+    old_dir = out_dir.with_name(out_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if out_dir.exists():
+        out_dir.rename(old_dir)
+    tmp_dir.rename(out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    return ColumnarSnapshot.open(out_dir)
+
+
+def _close(a: Any, b: Any, tol: float) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(float(a) - float(b)) <= tol
+    return a == b
+
+
+def _compare_rows(name: str, expected: list[tuple], actual: list[tuple], tol: float) -> list[str]:
+    if len(expected) != len(actual):
+        return [f"{name}: row count differs (sql={len(expected)} columnar={len(actual)})"]
+    problems: list[str] = []
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if len(e) != len(a) or not all(_close(x, y, tol) for x, y in zip(e, a)):
+            problems.append(f"{name}: row {i} differs (sql={e} columnar={a})")
+            if len(problems) >= 5:
+                break
+    return problems
+
+
+# Parity check: run the sql/ reports and compare with the columnar engine.
+# Report 12's running total is compared per (month, branch) only, because SQL
+# orders rows with equal year_month arbitrarily inside that window.
+def verify_against_sql(conn: sqlite3.Connection, snapshot: ColumnarSnapshot, sql_dir: Path) -> list[str]:
+    def run(filename: str) -> list[tuple]:
+        return db.fetch_all(conn, (sql_dir / filename).read_text(encoding="utf-8"))
+
+    tol = 0.011
+    problems: list[str] = []
+    problems += _compare_rows("kpi_tiles", run("03.KPI Dashboard (5 Tiles).sql"), snapshot.kpi_tiles(), tol)
+    problems += _compare_rows(
+        "daily_running_revenue_by_branch",
+        run("11.Running Revenue by Branch (Daily).sql"),
+        snapshot.daily_running_revenue_by_branch(),
+        tol,
+    )
+    problems += _compare_rows(
+        "mom_revenue_by_branch", run("13.Month-over-month revenue by branch.sql"), snapshot.mom_revenue_by_branch(), tol
+    )
+    problems += _compare_rows(
+        "top3_product_lines_by_branch",
+        run("14.Top 3 Product Lines per Branch (Revenue Rank).sql"),
+        snapshot.top3_product_lines_by_branch(),
+        tol,
+    )
+
+    def by_key(rows: list[tuple]) -> tuple[list[tuple], list[tuple]]:
+        ranked = sorted((r[0], r[1], r[2], r[3], r[4], r[5]) for r in rows)
+        month_end: dict[tuple, float] = {}
+        for r in rows:
+            month_end[(r[0], r[1])] = max(month_end.get((r[0], r[1]), float("-inf")), r[6])
+        return ranked, sorted(month_end.items())
+
+    sql_ranked, sql_running = by_key(run("12.Monthly Revenue by Branch & Product Line.sql"))
+    col_ranked, col_running = by_key(snapshot.monthly_revenue_by_branch_product_line())
+    problems += _compare_rows("monthly_revenue_by_branch_product_line", sql_ranked, col_ranked, 1e-6)
+    problems += _compare_rows(
+        "monthly_running_revenue_in_branch",
+        [(k[0], k[1], v) for k, v in sql_running],
+        [(k[0], k[1], v) for k, v in col_running],
+        1e-6,
+    )
+    return problems
@@ -2,8 +2,6 @@ import os
 from dataclasses import dataclass
 from pathlib import Path
 
-from dotenv import load_dotenv
-
 
 @dataclass(frozen=True)
 class Settings:
@@ -15,7 +13,7 @@ class Settings:
 
 # Load settings from environment (optionally via .env)
 def load_settings() -> Settings:
-    load_dotenv(override=False)
+    _load_dotenv_if_present()
 
     repo_root = Path(__file__).resolve().parents[1]
 
@@ -51,3 +49,17 @@ def load_settings() -> Settings:
         sqlite_db_path=sqlite_db_path,
         log_level=log_level,
     )
+
+
+# python-dotenv is only imported when there is a .env to read. load_dotenv()
+# searches upward from this file (or the cwd in notebooks), so check those first.
+def _load_dotenv_if_present() -> None:
+    here = Path(__file__).resolve().parent
+    cwd = Path.cwd()
+    candidates = (here, *here.parents, cwd, *cwd.parents)
+    if not any((d / ".env").is_file() for d in candidates):
+        return
+
+    from dotenv import load_dotenv
+
+    load_dotenv(override=False)
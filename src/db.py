@@ -1,21 +1,134 @@
+import logging
+import re
 import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Iterable, Optional, Tuple, List
 
+logger = logging.getLogger(__name__)
 
-def connect(db_path: Path) -> sqlite3.Connection:
+# "SCAN t" / "SCAN TABLE t" without an index is a full table scan
+_FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(?P<table>[^\s(]+)(?P<rest>.*)$")
+
+
+@dataclass
+class StatementStats:
+    sql: str
+    kind: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    plan: List[str] = field(default_factory=list)
+    full_scans: List[str] = field(default_factory=list)
+
+
+# Opt-in statement profiler: times every db.* call, counts rows, and captures
+# EXPLAIN QUERY PLAN for statements slower than threshold_ms
+@dataclass
+class QueryProfiler:
+    threshold_ms: float = 50.0
+    trace: bool = False
+    stats: dict[str, StatementStats] = field(default_factory=dict)
+    traced: Counter = field(default_factory=Counter)
+
+    def record(
+        self,
+        conn: sqlite3.Connection,
+        kind: str,
+        sql: str,
+        elapsed_ms: float,
+        rows: int,
+        params: Optional[Tuple[Any, ...]] = None,
+    ) -> None:
+        key = _normalize_sql(sql)
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = StatementStats(sql=key, kind=kind)
+
+        st.calls += 1
+        st.total_ms += elapsed_ms
+        st.max_ms = max(st.max_ms, elapsed_ms)
+        st.rows += max(rows, 0)
+
+        if elapsed_ms >= self.threshold_ms and not st.plan and kind != "script":
+            st.plan = _explain(conn, sql, params)
+            st.full_scans = _full_scans(st.plan)
+            logger.warning(
+                "Slow SQL (%.1f ms, %d rows)%s: %s",
+                elapsed_ms,
+                rows,
+                f" full scan of {st.full_scans}" if st.full_scans else "",
+                _shorten(key),
+            )
+
+    def on_trace(self, statement: str) -> None:
+        self.traced[_normalize_sql(statement)] += 1
+        logger.debug("SQL trace: %s", _shorten(statement))
+
+    def report(self) -> List[StatementStats]:
+        return sorted(self.stats.values(), key=lambda s: s.total_ms, reverse=True)
+
+    def log_report(self, top_n: int = 15) -> None:
+        ranked = self.report()
+        total_ms = sum(s.total_ms for s in ranked)
+        logger.info("SQL profile: %d distinct statements, %.1f ms total", len(ranked), total_ms)
+        for st in ranked[:top_n]:
+            logger.info(
+                "  %8.1f ms  %5d calls  max %7.1f ms  %8d rows  %-9s%s  %s",
+                st.total_ms,
+                st.calls,
+                st.max_ms,
+                st.rows,
+                st.kind,
+                "  FULL SCAN " + ",".join(st.full_scans) if st.full_scans else "",
+                _shorten(st.sql),
+            )
+        if self.traced:
+            logger.info("SQL trace: %d statements executed by SQLite", sum(self.traced.values()))
+
+
+class ProfilingConnection(sqlite3.Connection):
+    profiler: Optional[QueryProfiler] = None
+
+
+def connect(db_path: Path, *, profiler: Optional[QueryProfiler] = None) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    if profiler is None:
+        conn = sqlite3.connect(db_path)
+    else:
+        conn = sqlite3.connect(db_path, factory=ProfilingConnection)
+        conn.profiler = profiler
+        if profiler.trace:
+            conn.set_trace_callback(profiler.on_trace)
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
 
 def execute_script(conn: sqlite3.Connection, sql: str) -> None:
+    profiler = getattr(conn, "profiler", None)
+    if profiler is None:
+        conn.executescript(sql)
+        return
+
+    changes_before = conn.total_changes
+    started = time.perf_counter()
     conn.executescript(sql)
+    profiler.record(conn, "script", sql, _elapsed_ms(started), conn.total_changes - changes_before)
 
 
 def executemany(conn: sqlite3.Connection, sql: str, rows: Iterable[tuple[Any, ...]]) -> None:
-    conn.executemany(sql, rows)
+    profiler = getattr(conn, "profiler", None)
+    if profiler is None:
+        conn.executemany(sql, rows)
+        return
+
+    rows = list(rows)
+    started = time.perf_counter()
+    cur = conn.executemany(sql, rows)
+    profiler.record(conn, "many", sql, _elapsed_ms(started), cur.rowcount, rows[0] if rows else None)
 
 
 def fetch_all(
@@ -23,6 +136,42 @@ def fetch_all(
     sql: str,
     params: Optional[Tuple[Any, ...]] = None,
 ) -> List[Tuple[Any, ...]]:
+    profiler = getattr(conn, "profiler", None)
+    started = time.perf_counter()
     cur = conn.cursor()
     cur.execute(sql, params or ())
-    return cur.fetchall()
+    result = cur.fetchall()
+    if profiler is not None:
+        profiler.record(conn, "query", sql, _elapsed_ms(started), len(result), params)
+    return result
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000.0
+
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def _shorten(sql: str, limit: int = 120) -> str:
+    flat = _normalize_sql(sql)
+    return flat if len(flat) <= limit else flat[: limit - 3] + "..."
+
+
+def _explain(conn: sqlite3.Connection, sql: str, params: Optional[Tuple[Any, ...]]) -> List[str]:
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    except sqlite3.Error as e:
+        logger.debug("EXPLAIN QUERY PLAN failed: %s", e)
+        return []
+    return [str(r[-1]) for r in rows]
+
+
+def _full_scans(plan: List[str]) -> List[str]:
+    tables: List[str] = []
+    for detail in plan:
+        m = _FULL_SCAN_RE.match(detail)
+        if m and "USING" not in m.group("rest") and m.group("table") != "CONSTANT":
+            tables.append(m.group("table"))
+    return tables
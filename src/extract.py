@@ -48,15 +48,11 @@ def extract_latest_dataset(*, dataset: str, output_dir: Path) -> Path:
 
     _ensure_kaggle_env_credentials_present()
 
+    with _temporary_kaggle_config_dir():
+        # Imported here: the client is slow to import and authenticates from
+        # $KAGGLE_CONFIG_DIR at import time, so it must follow the temp config.
+        from kaggle.api.kaggle_api_extended import KaggleApi
 
-
-@contextmanager
-
-    """Create a temporary kaggle.json for the Kaggle client.
-
-    The Kaggle API reads credentials from $KAGGLE_CONFIG_DIR/kaggle.json.
-    This keeps credentials out of the repo while still enabling API usage.
-    """
         api = KaggleApi()
         try:
             api.authenticate()
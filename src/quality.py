@@ -0,0 +1,98 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .validate import env_bool, env_float
+
+logger = logging.getLogger(__name__)
+
+# Bump when rules change so checkpointed bronze loads are re-gated
+RULESET_VERSION = "1"
+
+MONEY_COLUMNS = ["unit_price", "tax_5_percent", "total", "cogs", "gross_income"]
+NUMERIC_COLUMNS = MONEY_COLUMNS + ["quantity", "gross_margin_percentage", "rating"]
+
+TAX_RATE = 0.05
+
+
+def gate_enabled() -> bool:
+    return env_bool("DQ_GATE_ENABLED", True)
+
+
+def derived_tolerance() -> float:
+    return max(0.0, env_float("DQ_DERIVED_TOLERANCE", 0.01))
+
+
+def _col(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index, dtype="float64")
+
+
+def _mask(cond: pd.Series) -> np.ndarray:
+    return cond.fillna(False).to_numpy(dtype=bool)
+
+
+def _off_by_more_than(actual: pd.Series, expected: pd.Series, tolerance: float) -> np.ndarray:
+    diff = (actual.astype("float64") - expected.astype("float64")).abs()
+    return _mask(diff > tolerance)
+
+
+# Vectorized row-level rules; returns reason code -> boolean mask (True = fails)
+def evaluate_rules(df: pd.DataFrame, source: pd.DataFrame, *, tolerance: float) -> dict[str, np.ndarray]:
+    rules: dict[str, np.ndarray] = {}
+
+    if "date" in df.columns and "date" in source.columns:
+        rules["unparseable_date"] = _mask(source["date"].notna() & df["date"].isna())
+
+    unparseable = np.zeros(len(df), dtype=bool)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and col in source.columns:
+            unparseable |= _mask(source[col].notna() & df[col].isna())
+    rules["unparseable_number"] = unparseable
+
+    negative = np.zeros(len(df), dtype=bool)
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            negative |= _mask(df[col] < 0)
+    rules["negative_money"] = negative
+
+    rules["nonpositive_quantity"] = _mask(_col(df, "quantity") <= 0)
+
+    rating = _col(df, "rating")
+    rules["rating_out_of_range"] = _mask((rating < 0) | (rating > 10))
+
+    cogs = _col(df, "cogs")
+    tax = _col(df, "tax_5_percent")
+    total = _col(df, "total")
+    rules["tax_mismatch"] = _off_by_more_than(tax, cogs * TAX_RATE, tolerance)
+    rules["total_mismatch"] = _off_by_more_than(total, cogs + tax, tolerance)
+    rules["gross_income_mismatch"] = _off_by_more_than(_col(df, "gross_income"), total - cogs, tolerance)
+
+    return rules
+
+
+# Split a normalized batch into (clean, quarantined); quarantined rows carry
+# a comma-separated reason_codes column and their source date text
+def apply_quality_gate(df: pd.DataFrame, source: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rules = evaluate_rules(df, source, tolerance=derived_tolerance())
+
+    failed = np.zeros(len(df), dtype=bool)
+    reasons = pd.Series("", index=df.index, dtype="object")
+    for code, mask in rules.items():
+        failed |= mask
+        reasons = reasons + np.where(mask, code + ",", "")
+
+    if not failed.any():
+        return df, df.iloc[0:0].assign(reason_codes=pd.Series(dtype="object"))
+
+    quarantined = df[failed].copy()
+    quarantined["reason_codes"] = reasons[failed].str.rstrip(",")
+    if "date" in source.columns:
+        quarantined["date"] = source.loc[failed, "date"].astype("string")
+
+    counts = {code: int(mask.sum()) for code, mask in rules.items() if mask.any()}
+    logger.warning("Quality gate quarantined %d of %d rows: %s", int(failed.sum()), len(df), counts)
+
+    return df[~failed], quarantined
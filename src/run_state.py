@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from . import db
+from .schema_sql import DDL_RUN_STATE
+
+logger = logging.getLogger(__name__)
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    stage: str
+    status: str
+    input_fingerprint: Optional[str]
+    outputs: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def ensure_run_state_table(conn: sqlite3.Connection) -> None:
+    db.execute_script(conn, DDL_RUN_STATE)
+
+
+# Stable digest of arbitrary JSON-serializable parts
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Cheap change marker for a table: (row count, max rowid, delete/update count).
+# The mutation count comes from the triggers in DDL_SQLITE; tables without them
+# (or a DB created before them) report 0 and fall back to count + max rowid.
+def table_generation(conn: sqlite3.Connection, table: str) -> tuple[int, int, int]:
+    row = db.fetch_all(conn, f"SELECT COUNT(*), MAX(rowid) FROM {table}")[0]
+    try:
+        mutations = db.fetch_all(conn, "SELECT mutations FROM meta_table_mutations WHERE table_name = ?", (table,))
+    except sqlite3.OperationalError:
+        mutations = []
+    return int(row[0] or 0), int(row[1] or 0), int(mutations[0][0]) if mutations else 0
+
+
+def get_stage(conn: sqlite3.Connection, stage: str) -> Optional[StageRecord]:
+    rows = db.fetch_all(
+        conn,
+        """
+        SELECT stage, status, input_fingerprint, outputs, error, started_at, completed_at
+        FROM meta_pipeline_run_state
+        WHERE stage = ?
+        """,
+        (stage,),
+    )
+    if not rows:
+        return None
+
+    stage_name, status, input_fp, outputs, error, started_at, completed_at = rows[0]
+    return StageRecord(
+        stage=stage_name,
+        status=status,
+        input_fingerprint=input_fp,
+        outputs=json.loads(outputs) if outputs else {},
+        error=error,
+        started_at=started_at,
+        completed_at=completed_at,
+    )
+
+
+def stage_fingerprint(conn: sqlite3.Connection, stage: str) -> Optional[str]:
+    record = get_stage(conn, stage)
+    return record.input_fingerprint if record else None
+
+
+def mark_stage_started(conn: sqlite3.Connection, stage: str) -> None:
+    db.executemany(
+        conn,
+        """
+        INSERT INTO meta_pipeline_run_state(stage, status, started_at)
+        VALUES (?,?,?)
+        ON CONFLICT(stage) DO UPDATE SET
+            status = excluded.status,
+            error = NULL,
+            started_at = excluded.started_at,
+            completed_at = NULL
+        """,
+        [(stage, STATUS_RUNNING, _utc_now_iso())],
+    )
+
+
+def mark_stage_complete(
+    conn: sqlite3.Connection,
+    stage: str,
+    input_fingerprint: Optional[str],
+    outputs: Optional[dict[str, Any]] = None,
+) -> None:
+    db.executemany(
+        conn,
+        """
+        UPDATE meta_pipeline_run_state
+        SET status = ?, input_fingerprint = ?, outputs = ?, error = NULL, completed_at = ?
+        WHERE stage = ?
+        """,
+        [(STATUS_COMPLETE, input_fingerprint, json.dumps(outputs or {}, default=str), _utc_now_iso(), stage)],
+    )
+
+
+def mark_stage_failed(conn: sqlite3.Connection, stage: str, error: str) -> None:
+    db.executemany(
+        conn,
+        "UPDATE meta_pipeline_run_state SET status = ?, error = ? WHERE stage = ?",
+        [(STATUS_FAILED, error, stage)],
+    )
+
+
+def reset_stage(conn: sqlite3.Connection, stage: str) -> None:
+    db.executemany(conn, "DELETE FROM meta_pipeline_run_state WHERE stage = ?", [(stage,)])
+
+
+def reset_run_state(conn: sqlite3.Connection) -> None:
+    db.execute_script(conn, "DELETE FROM meta_pipeline_run_state;")
+
+
+# Run one stage unless it already completed against the same fingerprint.
+# The fingerprint is re-evaluated after the stage so it captures the stage's own
+# outputs too; an unchanged fingerprint on the next run means nothing moved.
+def run_stage(
+    conn: sqlite3.Connection,
+    stage: str,
+    fingerprint_fn: Callable[[], str],
+    action: Callable[[], Optional[dict[str, Any]]],
+) -> dict[str, Any]:
+    record = get_stage(conn, stage)
+    if record and record.status == STATUS_COMPLETE and record.input_fingerprint == fingerprint_fn():
+        logger.info("Stage %s: inputs unchanged since %s; skipping", stage, record.completed_at)
+        return record.outputs
+
+    logger.info("Stage %s: running", stage)
+    mark_stage_started(conn, stage)
+    conn.commit()
+
+    try:
+        outputs = action() or {}
+    except Exception as e:
+        conn.rollback()
+        mark_stage_failed(conn, stage, f"{type(e).__name__}: {e}")
+        conn.commit()
+        raise
+
+    mark_stage_complete(conn, stage, fingerprint_fn(), outputs)
+    conn.commit()
+    return outputs
@@ -1,4 +1,7 @@
 import logging
+import sqlite3
+from pathlib import Path
+from typing import Optional
 
 from .config import load_settings
 from .extract import extract_latest_dataset, find_first_csv
@@ -11,38 +14,178 @@ from .transform_load import (
     read_raw_csv,
     scd2_upsert_dim_branch,
 )
-from .validate import validate_sqlite_db
+from .validate import env_bool, env_float, validate_sqlite_db
+from . import columnar
 from . import db
+from . import quality
+from . import run_state
 
 logger = logging.getLogger(__name__)
 
+# Pseudo-stage marking a whole run; "running" on startup means the previous run died
+PIPELINE_STAGE = "pipeline"
 
-def run_pipeline() -> None:
+
+# csv_path skips the Kaggle extract (CLI `load`); run_validation=False leaves
+# validation to a separate `validate` invocation
+def run_pipeline(
+    *,
+    csv_path: Optional[Path] = None,
+    engine: Optional[str] = None,
+    run_validation: bool = True,
+) -> None:
     settings = load_settings()
     configure_logging(settings.log_level)
 
     raw_dir = settings.data_dir / "raw"
-    extracted_dir = extract_latest_dataset(dataset=settings.kaggle_dataset, output_dir=raw_dir)
-    csv_path = find_first_csv(extracted_dir)
+    resume_enabled = env_bool("PIPELINE_RESUME", True)
 
-    conn = db.connect(settings.sqlite_db_path)
-    try:
-        logger.info("Creating (or recreating) tables")
-        db.execute_script(conn, DDL_SQLITE)
+    profiler = None
+    if env_bool("DB_PROFILE", False):
+        profiler = db.QueryProfiler(
+            threshold_ms=env_float("DB_PROFILE_THRESHOLD_MS", 50.0),
+            trace=env_bool("DB_PROFILE_TRACE", False),
+        )
 
-        frames = read_raw_csv(csv_path)
-        load_staging(conn, frames)
+    conn = db.connect(settings.sqlite_db_path, profiler=profiler)
+    try:
+        run_state.ensure_run_state_table(conn)
+        if not resume_enabled:
+            logger.info("PIPELINE_RESUME disabled; ignoring run-state ledger")
+            run_state.reset_run_state(conn)
 
-        ensure_dim_product_line(conn)
-        scd2_upsert_dim_branch(conn)
-        load_fact_sales(conn)
+        previous_run = run_state.get_stage(conn, PIPELINE_STAGE)
+        resuming = previous_run is not None and previous_run.status != run_state.STATUS_COMPLETE
+        if resuming:
+            logger.info("Previous run did not complete (%s); resuming", previous_run.status)
 
+        run_state.mark_stage_started(conn, PIPELINE_STAGE)
         conn.commit()
+
+        if csv_path is not None:
+            extracted = {"csv_path": str(csv_path), "csv_sha256": run_state.file_sha256(csv_path)}
+        else:
+            # A finished run always re-extracts (the remote dataset may have moved on);
+            # an interrupted run reuses the CSV it already downloaded.
+            extract_record = run_state.get_stage(conn, "extract")
+            if extract_record is not None:
+                csv_recorded = extract_record.outputs.get("csv_path")
+                if not resuming or not csv_recorded or not Path(csv_recorded).exists():
+                    run_state.reset_stage(conn, "extract")
+
+            def do_extract() -> dict:
+                extracted_dir = extract_latest_dataset(dataset=settings.kaggle_dataset, output_dir=raw_dir)
+                csv_file = find_first_csv(extracted_dir)
+                return {"csv_path": str(csv_file), "csv_sha256": run_state.file_sha256(csv_file)}
+
+            extracted = run_state.run_stage(
+                conn,
+                "extract",
+                lambda: run_state.fingerprint(settings.kaggle_dataset),
+                do_extract,
+            )
+
+        csv_path = Path(extracted["csv_path"])
+
+        def do_bronze() -> dict:
+            logger.info("Creating (or recreating) tables")
+            db.execute_script(conn, DDL_SQLITE)
+            frames = read_raw_csv(csv_path, engine=engine)
+            load_staging(conn, frames)
+            return {"bronze_rows": len(frames.raw)}
+
+        run_state.run_stage(
+            conn,
+            "bronze",
+            lambda: run_state.fingerprint(
+                extracted["csv_sha256"],
+                DDL_SQLITE,
+                quality.RULESET_VERSION,
+                quality.gate_enabled(),
+                quality.derived_tolerance(),
+                _generation(conn, "bronze_sales_raw"),
+            ),
+            do_bronze,
+        )
+
+        run_state.run_stage(
+            conn,
+            "dim_product_line",
+            lambda: run_state.fingerprint(
+                run_state.stage_fingerprint(conn, "bronze"),
+                _generation(conn, "silver_dim_product_line"),
+            ),
+            lambda: ensure_dim_product_line(conn),
+        )
+
+        run_state.run_stage(
+            conn,
+            "dim_branch",
+            lambda: run_state.fingerprint(
+                run_state.stage_fingerprint(conn, "bronze"),
+                _generation(conn, "silver_dim_branch"),
+            ),
+            lambda: scd2_upsert_dim_branch(conn),
+        )
+
+        # Watermark (max sales_key before the stage) scopes delta validation to this run's rows
+        def do_fact() -> dict:
+            sales_watermark = _generation(conn, "silver_fact_sales")[1]
+            load_fact_sales(conn)
+            fact_rows = _generation(conn, "silver_fact_sales")[0]
+            return {"fact_rows": fact_rows, "sales_key_watermark": sales_watermark}
+
+        fact_outputs = run_state.run_stage(
+            conn,
+            "fact",
+            lambda: run_state.fingerprint(
+                run_state.stage_fingerprint(conn, "bronze"),
+                run_state.stage_fingerprint(conn, "dim_product_line"),
+                run_state.stage_fingerprint(conn, "dim_branch"),
+                _generation(conn, "silver_fact_sales"),
+            ),
+            do_fact,
+        )
         logger.info("Pipeline complete. SQLite DB at %s", settings.sqlite_db_path)
 
-        validate_sqlite_db(settings.sqlite_db_path)
+        if run_validation:
+            run_state.run_stage(
+                conn,
+                "validate",
+                lambda: run_state.fingerprint(run_state.stage_fingerprint(conn, "fact")),
+                lambda: validate_sqlite_db(
+                    settings.sqlite_db_path,
+                    profiler=profiler,
+                    since_sales_key=fact_outputs.get("sales_key_watermark"),
+                ),
+            )
+
+        if env_bool("COLUMNAR_SNAPSHOT", True):
+            columnar_dir = settings.data_dir / "columnar"
+            run_state.run_stage(
+                conn,
+                "columnar",
+                lambda: run_state.fingerprint(
+                    run_state.stage_fingerprint(conn, "fact"),
+                    (columnar_dir / columnar.META_FILE).exists(),
+                ),
+                lambda: {"rows": len(columnar.snapshot_fact_columns(conn, columnar_dir))},
+            )
+
+        run_state.mark_stage_complete(conn, PIPELINE_STAGE, None)
+        conn.commit()
     finally:
         conn.close()
+        if profiler is not None:
+            profiler.log_report()
+
+
+# Table generation, tolerating tables that the DDL has not created yet
+def _generation(conn, table: str) -> tuple[int, int, int]:
+    try:
+        return run_state.table_generation(conn, table)
+    except sqlite3.OperationalError:
+        return 0, 0, 0
 
 
 if __name__ == "__main__":
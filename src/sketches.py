@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import sqlite3
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 12
+QUANTILE_RELATIVE_ACCURACY = 0.01
+
+SKETCH_GRAINS = ("branch_day", "branch_month", "branch", "day", "month", "all")
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    x = x.astype(np.uint64, copy=True)
+    n = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+# HyperLogLog over 64-bit hashes; merge = register-wise max
+@dataclass
+class HyperLogLog:
+    precision: int = HLL_PRECISION
+    registers: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        if self.registers is None:
+            self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add_values(self, values: Iterable[Any]) -> None:
+        arr = np.asarray([v for v in values if v is not None], dtype=object)
+        if len(arr):
+            self.add_hashes(pd.util.hash_array(arr))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        idx = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        rank = np.minimum(64 - _bit_length(rest) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "HyperLogLog":
+        return cls(precision=payload[0], registers=np.frombuffer(payload[1:], dtype=np.uint8).copy())
+
+
+# DDSketch-style quantile sketch: log-spaced buckets with bounded relative error;
+# merge = bucket-wise sum
+@dataclass
+class QuantileSketch:
+    relative_accuracy: float = QUANTILE_RELATIVE_ACCURACY
+    bins: dict[int, int] = field(default_factory=dict)
+    zero_count: int = 0
+
+    @property
+    def _gamma(self) -> float:
+        return (1.0 + self.relative_accuracy) / (1.0 - self.relative_accuracy)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add_values(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 1e-9]
+        self.zero_count += int(len(values) - len(positive))
+        if not len(positive):
+            return
+        keys = np.ceil(np.log(positive) / math.log(self._gamma)).astype(np.int64)
+        uniq, counts = np.unique(keys, return_counts=True)
+        for k, c in zip(uniq.tolist(), counts.tolist()):
+            self.bins[k] = self.bins.get(k, 0) + c
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches with different accuracy")
+        self.zero_count += other.zero_count
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+
+    def quantile(self, q: float) -> Optional[float]:
+        n = self.count
+        if n == 0:
+            return None
+        rank = q * (n - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        gamma = self._gamma
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return 2.0 * gamma**k / (gamma + 1.0)
+        return 2.0 * gamma ** max(self.bins) / (gamma + 1.0)
+
+    def to_json(self) -> str:
+        return json.dumps({"a": self.relative_accuracy, "z": self.zero_count, "b": self.bins})
+
+    @classmethod
+    def from_json(cls, payload: str) -> "QuantileSketch":
+        raw = json.loads(payload)
+        return cls(
+            relative_accuracy=float(raw["a"]),
+            bins={int(k): int(v) for k, v in raw["b"].items()},
+            zero_count=int(raw["z"]),
+        )
+
+
+# Fold fact rows with sales_key > since_sales_key into the branch x day sketches.
+# Only rows inserted by the current load are read, so reruns do not double count.
+def update_daily_sales_sketches(conn: sqlite3.Connection, since_sales_key: int) -> None:
+    if not db.fetch_all(conn, "SELECT 1 FROM gold_sales_sketch_daily LIMIT 1"):
+        since_sales_key = 0  # empty gold table: (re)build from the full history
+
+    new_rows = db.fetch_all(
+        conn,
+        """
+        SELECT b.branch_code, f.txn_date, f.invoice_id, f.total
+        FROM silver_fact_sales f
+        JOIN silver_dim_branch b
+          ON b.branch_key = f.branch_key
+        WHERE f.sales_key > ?
+        """,
+        (since_sales_key,),
+    )
+    if not new_rows:
+        return
+
+    df = pd.DataFrame(new_rows, columns=["branch_code", "txn_date", "invoice_id", "total"])
+    existing = {
+        (branch_code, txn_date): (row_count, hll, quantiles)
+        for branch_code, txn_date, row_count, hll, quantiles in db.fetch_all(
+            conn,
+            """
+            SELECT branch_code, txn_date, row_count, invoice_hll, total_quantiles
+            FROM gold_sales_sketch_daily
+            WHERE txn_date BETWEEN ? AND ?
+            """,
+            (df["txn_date"].min(), df["txn_date"].max()),
+        )
+    }
+
+    now = _utc_now_iso()
+    upserts: list[tuple] = []
+    for (branch_code, txn_date), part in df.groupby(["branch_code", "txn_date"], sort=False):
+        hll = HyperLogLog()
+        quantiles = QuantileSketch()
+        row_count = len(part)
+
+        prior = existing.get((branch_code, txn_date))
+        if prior is not None:
+            row_count += int(prior[0])
+            hll = HyperLogLog.from_bytes(prior[1])
+            quantiles = QuantileSketch.from_json(prior[2])
+
+        hll.add_values(part["invoice_id"].tolist())
+        quantiles.add_values(part["total"].to_numpy(dtype=np.float64, na_value=np.nan))
+        upserts.append((branch_code, txn_date, row_count, hll.to_bytes(), quantiles.to_json(), now))
+
+    logger.info("Updating %d branch x day sales sketches", len(upserts))
+    db.executemany(
+        conn,
+        """
+        INSERT INTO gold_sales_sketch_daily(
+            branch_code, txn_date, row_count, invoice_hll, total_quantiles, updated_at
+        ) VALUES (?,?,?,?,?,?)
+        ON CONFLICT(branch_code, txn_date) DO UPDATE SET
+            row_count = excluded.row_count,
+            invoice_hll = excluded.invoice_hll,
+            total_quantiles = excluded.total_quantiles,
+            updated_at = excluded.updated_at
+        """,
+        upserts,
+    )
+
+
+def _grain_key(grain: str, branch_code: str, txn_date: str) -> tuple:
+    if grain == "branch_day":
+        return (branch_code, txn_date)
+    if grain == "branch_month":
+        return (branch_code, txn_date[:7])
+    if grain == "branch":
+        return (branch_code,)
+    if grain == "day":
+        return (txn_date,)
+    if grain == "month":
+        return (txn_date[:7],)
+    return ()
+
+
+# Merge the daily sketches to a coarser grain and read approximate metrics:
+# distinct invoices, median and p90 basket total
+def rollup_sales_sketches(
+    conn: sqlite3.Connection,
+    grain: str = "branch_month",
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> list[dict[str, Any]]:
+    if grain not in SKETCH_GRAINS:
+        raise ValueError(f"Unknown sketch grain {grain!r}; expected one of {SKETCH_GRAINS}")
+
+    rows = db.fetch_all(
+        conn,
+        """
+        SELECT branch_code, txn_date, row_count, invoice_hll, total_quantiles
+        FROM gold_sales_sketch_daily
+        WHERE txn_date >= COALESCE(?, txn_date)
+          AND txn_date <= COALESCE(?, txn_date)
+        ORDER BY branch_code, txn_date
+        """,
+        (start_date, end_date),
+    )
+
+    merged: dict[tuple, list] = defaultdict(lambda: [0, HyperLogLog(), QuantileSketch()])
+    for branch_code, txn_date, row_count, hll, quantiles in rows:
+        acc = merged[_grain_key(grain, branch_code, txn_date)]
+        acc[0] += int(row_count)
+        acc[1].merge(HyperLogLog.from_bytes(hll))
+        acc[2].merge(QuantileSketch.from_json(quantiles))
+
+    out: list[dict[str, Any]] = []
+    for key in sorted(merged):
+        row_count, hll, quantiles = merged[key]
+        out.append(
+            {
+                "key": key,
+                "transactions": row_count,
+                "approx_distinct_invoices": round(hll.estimate()),
+                "approx_p50_total": quantiles.quantile(0.5),
+                "approx_p90_total": quantiles.quantile(0.9),
+            }
+        )
+    return out
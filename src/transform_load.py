@@ -1,46 +1,65 @@
 import hashlib
 import logging
-from dataclasses import dataclass
+import os
+import re
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from . import db
+from . import quality
+from . import sketches
 
 logger = logging.getLogger(__name__)
 
 @dataclass(frozen=True)
 class NormalizedFrames:
     raw: pd.DataFrame
+    quarantine: pd.DataFrame = field(default_factory=pd.DataFrame)
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
+# Source column -> stable snake_case name ("Sales" is an alias of "Total")
+SOURCE_COLUMN_MAP = {
+    "Invoice ID": "invoice_id",
+    "Branch": "branch",
+    "City": "city",
+    "Customer type": "customer_type",
+    "Gender": "gender",
+    "Product line": "product_line",
+    "Unit price": "unit_price",
+    "Quantity": "quantity",
+    "Tax 5%": "tax_5_percent",
+    "Total": "total",
+    "Sales": "total",
+    "Date": "date",
+    "Time": "time",
+    "Payment": "payment",
+    "cogs": "cogs",
+    "gross margin percentage": "gross_margin_percentage",
+    "gross income": "gross_income",
+    "Rating": "rating",
+}
+
+# Parse types per normalized column, used by the schema-driven (arrow) engine
+_FLOAT_COLUMNS = ["unit_price", "tax_5_percent", "total", "cogs", "gross_margin_percentage", "gross_income", "rating"]
+_INT_COLUMNS = ["quantity"]
+
+_HASH_COLUMNS = ["invoice_id", "branch", "product_line", "date", "time", "total"]
+
+CSV_PARSE_ENGINES = ("pandas", "arrow")
+
+
 # Standardize source columns into a stable, snake_case schema
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    mapping = {
-        "Invoice ID": "invoice_id",
-        "Branch": "branch",
-        "City": "city",
-        "Customer type": "customer_type",
-        "Gender": "gender",
-        "Product line": "product_line",
-        "Unit price": "unit_price",
-        "Quantity": "quantity",
-        "Tax 5%": "tax_5_percent",
-        "Total": "total",
-        "Sales": "total",
-        "Date": "date",
-        "Time": "time",
-        "Payment": "payment",
-        "cogs": "cogs",
-        "gross margin percentage": "gross_margin_percentage",
-        "gross income": "gross_income",
-        "Rating": "rating",
-    }
+    mapping = SOURCE_COLUMN_MAP
 
     df2 = df.rename(columns={k: v for k, v in mapping.items() if k in df.columns}).copy()
     missing = [v for v in mapping.values() if v not in df2.columns]
@@ -58,37 +77,118 @@ def _parse_date_iso(date_series: pd.Series) -> pd.Series:
 
 # Deterministic hash used for idempotent fact loads
 def _row_hash(row: pd.Series) -> str:
-    parts = [
-        str(row.get("invoice_id", "")),
-        str(row.get("branch", "")),
-        str(row.get("product_line", "")),
-        str(row.get("date", "")),
-        str(row.get("time", "")),
-        str(row.get("total", "")),
-    ]
+    return _hash_parts([str(row.get(col, "")) for col in _HASH_COLUMNS])
+
+
+def _hash_parts(parts: list[str]) -> str:
     payload = "|".join(parts).encode("utf-8")
     return hashlib.sha256(payload).hexdigest()
 
 
-def read_raw_csv(csv_path: Path) -> NormalizedFrames:
-    logger.info("Reading raw CSV: %s", csv_path)
-    df = pd.read_csv(csv_path)
-    df = _normalize_columns(df)
+# Column-wise equivalent of df.apply(_row_hash, axis=1). Missing strings render
+# as "nan" whatever the string storage, so both parse engines hash identically.
+def _hash_rows(df: pd.DataFrame) -> pd.Series:
+    columns: list[list[str]] = []
+    for col in _HASH_COLUMNS:
+        if col not in df.columns:
+            columns.append([""] * len(df))
+            continue
+        values = df[col]
+        if col != "date" and isinstance(values.dtype, pd.StringDtype):
+            values = values.astype(object)
+            values = values.where(values.notna(), np.nan)
+        columns.append([str(v) for v in values.tolist()])
+    return pd.Series([_hash_parts(list(parts)) for parts in zip(*columns)], index=df.index, dtype="object")
+
+
+def csv_parse_engine() -> str:
+    engine = os.getenv("CSV_PARSE_ENGINE", "pandas").strip().lower()
+    if engine not in CSV_PARSE_ENGINES:
+        logger.warning("Invalid CSV_PARSE_ENGINE=%r; using pandas", engine)
+        return "pandas"
+    return engine
+
+
+# Multithreaded Arrow parse over a memory-mapped file with explicit column types;
+# strings stay Arrow-backed. A column with a value that does not fit its declared
+# type is re-read as text so pd.to_numeric (and the quality gate) can see it.
+def _read_csv_arrow(csv_path: Path) -> pd.DataFrame:
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError as e:
+        raise RuntimeError("CSV_PARSE_ENGINE=arrow requires pyarrow (pip install pyarrow)") from e
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    arrow_types = {name: pa.float64() for name in _FLOAT_COLUMNS}
+    arrow_types.update({name: pa.int64() for name in _INT_COLUMNS})
+    column_types = {
+        src: arrow_types.get(dst, pa.string()) for src, dst in SOURCE_COLUMN_MAP.items() if src in header
+    }
+    types_mapper = {pa.string(): pd.StringDtype("pyarrow"), pa.int64(): pd.Int64Dtype()}.get
+
+    def read(types: dict) -> pd.DataFrame:
+        convert = pa_csv.ConvertOptions(column_types=types, strings_can_be_null=True)
+        with pa.memory_map(str(csv_path), "r") as source:
+            table = pa_csv.read_csv(
+                source,
+                read_options=pa_csv.ReadOptions(use_threads=True),
+                convert_options=convert,
+            )
+        return table.to_pandas(types_mapper=types_mapper)
+
+    # Like the pandas C parser, only the column holding the bad value becomes
+    # text; the others keep their types so row_hash renders them identically
+    types = dict(column_types)
+    while True:
+        try:
+            return read(types)
+        except pa.ArrowInvalid as e:
+            match = re.search(r"column #(\d+)", str(e))
+            bad = header[int(match.group(1))] if match and int(match.group(1)) < len(header) else None
+            if bad is None or types.get(bad) == pa.string():
+                raise
+            logger.warning("Typed Arrow parse failed (%s); re-reading %r as text", e, bad)
+            types[bad] = pa.string()
+
+
+# Parse the source file only (no normalization); separated out for benchmarking
+def read_source_csv(csv_path: Path, *, engine: str = "pandas") -> pd.DataFrame:
+    if engine == "arrow":
+        return _read_csv_arrow(csv_path)
+    return pd.read_csv(csv_path)
+
+
+def read_raw_csv(csv_path: Path, *, engine: Optional[str] = None) -> NormalizedFrames:
+    engine = engine or csv_parse_engine()
+    logger.info("Reading raw CSV (%s engine): %s", engine, csv_path)
+    df = _normalize_columns(read_source_csv(csv_path, engine=engine))
+
+    # Pre-coercion copy so the quality gate can tell "unparseable" from "missing"
+    source = df[[c for c in ["date", *quality.NUMERIC_COLUMNS] if c in df.columns]].copy()
 
     if "date" in df.columns:
         df["date"] = _parse_date_iso(df["date"])
 
-    df["row_hash"] = df.apply(_row_hash, axis=1)
+    df["row_hash"] = _hash_rows(df)
 
-    for col in ["unit_price", "tax_5_percent", "total", "cogs", "gross_margin_percentage", "gross_income", "rating"]:
+    for col in _FLOAT_COLUMNS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    for col in ["quantity"]:
+    # Non-integral values (2.5) become null rather than being truncated, so the
+    # quality gate reports them as unparseable_number with either engine
+    for col in _INT_COLUMNS:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+            numeric = pd.to_numeric(df[col], errors="coerce")
+            integral = (numeric.isna() | (numeric % 1 == 0)).fillna(False).astype(bool)
+            df[col] = numeric.where(integral).astype("Int64")
+
+    if not quality.gate_enabled():
+        return NormalizedFrames(raw=df)
 
-    return NormalizedFrames(raw=df)
+    clean, quarantined = quality.apply_quality_gate(df, source)
+    return NormalizedFrames(raw=clean, quarantine=quarantined)
 
 
 def load_staging(conn, frames: NormalizedFrames) -> None:
@@ -136,6 +236,32 @@ def load_staging(conn, frames: NormalizedFrames) -> None:
         rows,
     )
 
+    if frames.quarantine.empty:
+        return
+
+    q = frames.quarantine.copy()
+    q["extracted_at"] = extracted_at
+    q_cols = [c for c in cols if c != "extracted_at"] + ["reason_codes", "extracted_at"]
+    for col in q_cols:
+        if col not in q.columns:
+            q[col] = None
+
+    logger.warning("Loading %d rows into quarantine", len(q))
+    q_rows = []
+    for _, r in q[q_cols].iterrows():
+        q_rows.append(tuple(None if pd.isna(v) else v for v in r.to_list()))
+    db.executemany(
+        conn,
+        """
+        INSERT INTO quarantine_sales_raw (
+            row_hash, invoice_id, branch, city, customer_type, gender, product_line,
+            unit_price, quantity, tax_5_percent, total, date, time, payment,
+            cogs, gross_margin_percentage, gross_income, rating, reason_codes, extracted_at
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        q_rows,
+    )
+
 
 # Type 1 dim: insert missing product lines
 def ensure_dim_product_line(conn) -> None:
@@ -234,6 +360,20 @@ def _lookup_current_branch_keys(conn) -> dict[str, int]:
     return {code: int(key) for key, code in rows}
 
 
+# Staged rows whose row_hash is not yet in the fact table. The NOT EXISTS probe
+# runs against the row_hash UNIQUE index inside SQLite, so rows from an
+# overlapping extract never reach Python and the cost follows the batch size.
+_STAGED_FACT_SELECT = """
+    SELECT
+        b.row_hash, b.invoice_id, b.product_line, b.branch, b.date, b.time,
+        b.unit_price, b.quantity, b.tax_5_percent, b.total, b.cogs, b.gross_income, b.rating,
+        b.payment, b.customer_type, b.gender
+    FROM bronze_sales_raw b
+    WHERE b.date IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM silver_fact_sales f WHERE f.row_hash = b.row_hash)
+"""
+
+
 # Load facts idempotently using row_hash uniqueness
 def load_fact_sales(conn) -> None:
     now = utc_now_iso()
@@ -241,17 +381,7 @@ def load_fact_sales(conn) -> None:
     product_keys = _lookup_product_line_keys(conn)
     branch_keys = _lookup_current_branch_keys(conn)
 
-    stg_rows = db.fetch_all(
-        conn,
-        """
-        SELECT
-            row_hash, invoice_id, product_line, branch, date, time,
-            unit_price, quantity, tax_5_percent, total, cogs, gross_income, rating,
-            payment, customer_type, gender
-        FROM bronze_sales_raw
-        WHERE date IS NOT NULL
-        """,
-    )
+    stg_rows = db.fetch_all(conn, _STAGED_FACT_SELECT)
 
     rows_to_insert: list[tuple] = []
     skipped_missing_dim = 0
@@ -307,6 +437,8 @@ def load_fact_sales(conn) -> None:
         logger.info("No fact rows to insert")
         return
 
+    watermark = db.fetch_all(conn, "SELECT COALESCE(MAX(sales_key), 0) FROM silver_fact_sales")[0][0]
+
     logger.info("Inserting %d fact rows (idempotent)", len(rows_to_insert))
     db.executemany(
         conn,
@@ -319,3 +451,5 @@ def load_fact_sales(conn) -> None:
         """,
         rows_to_insert,
     )
+
+    sketches.update_daily_sales_sketches(conn, since_sales_key=int(watermark))
@@ -1,13 +1,16 @@
 import logging
-import sqlite3
 import os
 from pathlib import Path
+from typing import Optional
+
+from . import db
 
 logger = logging.getLogger(__name__)
 
 
 EXPECTED_TABLES = {
     "bronze_sales_raw",
+    "quarantine_sales_raw",
     "silver_dim_product_line",
     "silver_dim_branch",
     "silver_fact_sales",
@@ -32,19 +35,48 @@ def env_float(name: str, default: float) -> float:
         return default
 
 
-# Lightweight validation checks for the generated SQLite DB
-def validate_sqlite_db(db_path: Path) -> None:
+VALIDATION_MODES = ("delta", "full")
+
+
+def _resolve_mode(mode: Optional[str], since_sales_key: Optional[int]) -> str:
+    resolved = (mode or os.getenv("DQ_VALIDATION_MODE") or ("delta" if since_sales_key is not None else "full")).lower()
+    if resolved not in VALIDATION_MODES:
+        logger.warning("Invalid validation mode %r; using full", resolved)
+        return "full"
+    if resolved == "delta" and since_sales_key is None:
+        logger.warning("Delta validation needs a load watermark; falling back to full")
+        return "full"
+    return resolved
+
+
+# Lightweight validation checks for the generated SQLite DB.
+# "delta" checks only fact rows above the load watermark (sales_key before this
+# run) plus cheap global invariants; "full" re-checks the whole history and is
+# meant for scheduled deep checks.
+def validate_sqlite_db(
+    db_path: Path,
+    *,
+    profiler: Optional[db.QueryProfiler] = None,
+    mode: Optional[str] = None,
+    since_sales_key: Optional[int] = None,
+) -> None:
     if not db_path.exists():
         raise FileNotFoundError(f"SQLite DB not found at: {db_path}")
 
     fail_on_warnings = env_bool("DQ_FAIL_ON_WARNINGS", False)
     min_fact_coverage = env_float("DQ_MIN_FACT_COVERAGE", 0.98)
     min_fact_coverage = max(0.0, min(1.0, float(min_fact_coverage)))
+    mode = _resolve_mode(mode, since_sales_key)
+    delta = mode == "delta"
 
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute("PRAGMA foreign_keys = ON;")
+    # Row scope for fact checks; full mode uses an always-true predicate
+    if delta:
+        fact_scope, fact_params = "f.sales_key > ?", (int(since_sales_key),)
+    else:
+        fact_scope, fact_params = "1 = 1", ()
 
+    conn = db.connect(db_path, profiler=profiler)
+    try:
         errors: list[str] = []
         warnings: list[str] = []
 
@@ -57,25 +89,24 @@ def validate_sqlite_db(db_path: Path) -> None:
             logger.error(msg)
 
         def count(sql: str, params: tuple | None = None) -> int:
-            row = conn.execute(sql, params or ()).fetchone()
-            return int(row[0]) if row and row[0] is not None else 0
+            rows = db.fetch_all(conn, sql, params)
+            return int(rows[0][0]) if rows and rows[0][0] is not None else 0
 
         tables = {
             r[0]
-            for r in conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
-            ).fetchall()
+            for r in db.fetch_all(conn, "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
         }
         missing = EXPECTED_TABLES - tables
         if missing:
             raise RuntimeError(f"Missing expected tables: {sorted(missing)}")
 
         bronze_rows = count("SELECT COUNT(*) FROM bronze_sales_raw")
-        fact_rows = count("SELECT COUNT(*) FROM silver_fact_sales")
+        fact_rows = count(f"SELECT COUNT(*) FROM silver_fact_sales f WHERE {fact_scope}", fact_params)
         dim_pl_rows = count("SELECT COUNT(*) FROM silver_dim_product_line")
         dim_branch_rows = count("SELECT COUNT(*) FROM silver_dim_branch")
         logger.info(
-            "Row counts: bronze=%d fact=%d dim_product_line=%d dim_branch=%d",
+            "Row counts (%s): bronze=%d fact=%d dim_product_line=%d dim_branch=%d",
+            f"delta since sales_key {since_sales_key}" if delta else "full",
             bronze_rows,
             fact_rows,
             dim_pl_rows,
@@ -84,41 +115,50 @@ def validate_sqlite_db(db_path: Path) -> None:
 
         if bronze_rows == 0:
             raise RuntimeError("bronze_sales_raw has 0 rows — extraction/load likely failed")
-        if fact_rows == 0:
+        # MAX over the INTEGER PRIMARY KEY is O(1); an empty delta batch is fine on a rerun
+        if count("SELECT MAX(sales_key) FROM silver_fact_sales") == 0:
             raise RuntimeError("silver_fact_sales has 0 rows — dim lookups or fact load likely failed")
 
         if dim_pl_rows == 0:
             raise RuntimeError("silver_dim_product_line has 0 rows — dimension load likely failed")
 
-        fact_dupes = count(
-            """
-            SELECT COUNT(*)
-            FROM (
-                SELECT row_hash
-                FROM silver_fact_sales
-                GROUP BY row_hash
-                HAVING COUNT(*) > 1
+        # The UNIQUE index already guarantees this; only re-proven in the deep check
+        if not delta:
+            fact_dupes = count(
+                """
+                SELECT COUNT(*)
+                FROM (
+                    SELECT row_hash
+                    FROM silver_fact_sales
+                    GROUP BY row_hash
+                    HAVING COUNT(*) > 1
+                )
+                """,
             )
-            """,
-        )
-        if fact_dupes:
-            raise RuntimeError("silver_fact_sales contains duplicate row_hash values (should be UNIQUE)")
+            if fact_dupes:
+                raise RuntimeError("silver_fact_sales contains duplicate row_hash values (should be UNIQUE)")
 
         # Coverage: how many distinct eligible bronze rows made it into the fact table.
-        expected_fact = count(
-            """
-            SELECT COUNT(*)
-            FROM (
-                SELECT DISTINCT row_hash
-                FROM bronze_sales_raw
-                WHERE date IS NOT NULL
-                  AND product_line IS NOT NULL
-                  AND branch IS NOT NULL
-                  AND city IS NOT NULL
+        eligible_bronze = """
+            SELECT DISTINCT row_hash
+            FROM bronze_sales_raw
+            WHERE date IS NOT NULL
+              AND product_line IS NOT NULL
+              AND branch IS NOT NULL
+              AND city IS NOT NULL
+        """
+        expected_fact = count(f"SELECT COUNT(*) FROM ({eligible_bronze})")
+        if delta:
+            # Probe the row_hash index per bronze row: cost follows the batch, not the history
+            actual_fact = count(
+                f"""
+                SELECT COUNT(*)
+                FROM ({eligible_bronze}) s
+                WHERE EXISTS (SELECT 1 FROM silver_fact_sales f WHERE f.row_hash = s.row_hash)
+                """,
             )
-            """,
-        )
-        actual_fact = fact_rows
+        else:
+            actual_fact = fact_rows
         if expected_fact > 0:
             coverage = actual_fact / float(expected_fact)
             logger.info("Fact coverage: %.3f (%d/%d)", coverage, actual_fact, expected_fact)
@@ -131,18 +171,22 @@ def validate_sqlite_db(db_path: Path) -> None:
         else:
             warn("No eligible bronze rows found for coverage check (date/product_line/branch/city all required)")
 
-        bad_txn_dates = conn.execute(
-            """
+        bad_txn_dates = db.fetch_all(
+            conn,
+            f"""
             SELECT txn_date
-            FROM silver_fact_sales
-            WHERE txn_date IS NOT NULL
+            FROM silver_fact_sales f
+            WHERE {fact_scope}
+              AND txn_date IS NOT NULL
               AND txn_date NOT GLOB '????-??-??'
             LIMIT 5
-            """
-        ).fetchall()
+            """,
+            fact_params,
+        )
         if bad_txn_dates:
             err(f"Found non-ISO txn_date values (sample): {[r[0] for r in bad_txn_dates]}")
 
+        # SCD2 invariants are global but the dimension is small, so both modes check them
         current_branch = count("SELECT COUNT(*) FROM silver_dim_branch WHERE is_current = 1")
         if current_branch == 0:
             err("silver_dim_branch has no current records (is_current=1)")
@@ -162,77 +206,106 @@ def validate_sqlite_db(db_path: Path) -> None:
         if multi_current:
             err(f"Found {multi_current} branch_code values with != 1 current record (SCD2 integrity issue)")
 
+        # Unscoped: the SCD2 close of the previous version updates an older row
+        bad_validity = count(
+            """
+            SELECT COUNT(*)
+            FROM silver_dim_branch
+            WHERE (is_current = 1 AND valid_to IS NOT NULL)
+               OR (is_current = 0 AND valid_to IS NULL)
+            """,
+        )
+        if bad_validity:
+            err(f"Found {bad_validity} silver_dim_branch rows whose valid_to disagrees with is_current")
+
         # Null checks (should be zero for NOT NULL columns; invoice_id is allowed but useful to know)
         null_fact_critical = count(
-            """
+            f"""
             SELECT COUNT(*)
-            FROM silver_fact_sales
-            WHERE row_hash IS NULL
+            FROM silver_fact_sales f
+            WHERE {fact_scope}
+              AND (row_hash IS NULL
                OR product_line_key IS NULL
                OR branch_key IS NULL
                OR txn_date IS NULL
-               OR loaded_at IS NULL
+               OR loaded_at IS NULL)
             """,
+            fact_params,
         )
         if null_fact_critical:
             err(f"silver_fact_sales has {null_fact_critical} rows with NULLs in critical columns")
 
         # Referential integrity (should be enforced by FK constraints, but validate anyway)
         unmatched_product = count(
-            """
+            f"""
             SELECT COUNT(*)
             FROM silver_fact_sales f
             LEFT JOIN silver_dim_product_line d
               ON f.product_line_key = d.product_line_key
-            WHERE d.product_line_key IS NULL
+            WHERE {fact_scope}
+              AND d.product_line_key IS NULL
             """,
+            fact_params,
         )
         if unmatched_product:
             err(f"Found {unmatched_product} fact rows with missing product_line_key in dim")
 
         unmatched_branch = count(
-            """
+            f"""
             SELECT COUNT(*)
             FROM silver_fact_sales f
             LEFT JOIN silver_dim_branch b
               ON f.branch_key = b.branch_key
-            WHERE b.branch_key IS NULL
+            WHERE {fact_scope}
+              AND b.branch_key IS NULL
             """,
+            fact_params,
         )
         if unmatched_branch:
             err(f"Found {unmatched_branch} fact rows with missing branch_key in dim")
 
-        # Basic numeric sanity checks
+        # Row-level rules are enforced before load by the quality gate; here we only count its rejects
+        quarantined = count("SELECT COUNT(*) FROM quarantine_sales_raw")
+        if quarantined:
+            warn(f"{quarantined} rows were quarantined by the pre-load quality gate (see quarantine_sales_raw)")
+
+        # Numeric sanity checks (the gate keeps these rows out of silver; re-checked per batch or in full)
         negative_money = count(
-            """
+            f"""
             SELECT COUNT(*)
-            FROM silver_fact_sales
-            WHERE (unit_price IS NOT NULL AND unit_price < 0)
+            FROM silver_fact_sales f
+            WHERE {fact_scope}
+              AND ((unit_price IS NOT NULL AND unit_price < 0)
                OR (tax_5_percent IS NOT NULL AND tax_5_percent < 0)
                OR (total IS NOT NULL AND total < 0)
                OR (cogs IS NOT NULL AND cogs < 0)
-               OR (gross_income IS NOT NULL AND gross_income < 0)
+               OR (gross_income IS NOT NULL AND gross_income < 0))
             """,
+            fact_params,
         )
         if negative_money:
             err(f"Found {negative_money} fact rows with negative monetary values")
 
         nonpositive_qty = count(
-            """
+            f"""
             SELECT COUNT(*)
-            FROM silver_fact_sales
-            WHERE quantity IS NOT NULL AND quantity <= 0
+            FROM silver_fact_sales f
+            WHERE {fact_scope}
+              AND quantity IS NOT NULL AND quantity <= 0
             """,
+            fact_params,
         )
         if nonpositive_qty:
             err(f"Found {nonpositive_qty} fact rows with non-positive quantity")
 
         rating_out_of_range = count(
-            """
+            f"""
             SELECT COUNT(*)
-            FROM silver_fact_sales
-            WHERE rating IS NOT NULL AND (rating < 0 OR rating > 10)
+            FROM silver_fact_sales f
+            WHERE {fact_scope}
+              AND rating IS NOT NULL AND (rating < 0 OR rating > 10)
             """,
+            fact_params,
         )
         if rating_out_of_range:
             warn(f"Found {rating_out_of_range} fact rows with rating outside [0,10]")
@@ -245,6 +318,6 @@ def validate_sqlite_db(db_path: Path) -> None:
                 parts.append("Warnings treated as errors:\n- " + "\n- ".join(warnings))
             raise RuntimeError("\n\n".join(parts))
 
-        logger.info("Validation passed (%d warnings)", len(warnings))
+        logger.info("Validation passed (%s, %d warnings)", mode, len(warnings))
     finally:
         conn.close()
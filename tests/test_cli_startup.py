@@ -0,0 +1,14 @@
+from src import bench
+
+
+# validate and report must start without pandas/numpy/pyarrow/kaggle and within
+# the import budget; each runs in a fresh interpreter under -X importtime.
+# Wall time depends on the machine's load, so it is only reported by `bench startup`.
+def test_light_commands_start_within_budget_without_heavy_imports():
+    results = bench.bench_cli_startup()
+
+    assert {r["command"] for r in results} == {" ".join(argv) for argv in bench.STARTUP_COMMANDS.values()}
+    for r in results:
+        assert not r["crashed"], f"{r['command']} raised during startup"
+        assert r["heavy_imports"] == [], f"{r['command']} imported {r['heavy_imports']}"
+        assert r["import_ms"] <= r["import_budget_ms"], f"{r['command']} spent {r['import_ms']:.0f}ms importing"
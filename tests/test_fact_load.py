@@ -0,0 +1,54 @@
+from src import db
+
+from .test_columnar_parity import BRANCHES, _load, _write_csv
+
+
+def _fact_hashes(conn) -> set[str]:
+    return {r[0] for r in db.fetch_all(conn, "SELECT row_hash FROM silver_fact_sales")}
+
+
+def test_reload_skips_loaded_rows_and_restores_deleted_ones(tmp_path, monkeypatch):
+    extract = tmp_path / "extract.csv"
+    _write_csv(extract, months=[1], cities=BRANCHES, start=0)
+
+    conn = db.connect(tmp_path / "fact.sqlite")
+    try:
+        _load(conn, extract, monkeypatch, "2019-04-01T00:00:00+00:00")
+        loaded = _fact_hashes(conn)
+        assert loaded
+
+        # Unchanged re-ingest inserts nothing
+        max_key = db.fetch_all(conn, "SELECT MAX(sales_key) FROM silver_fact_sales")[0][0]
+        _load(conn, extract, monkeypatch, "2019-04-02T00:00:00+00:00")
+        assert _fact_hashes(conn) == loaded
+        assert db.fetch_all(conn, "SELECT MAX(sales_key) FROM silver_fact_sales")[0][0] == max_key
+
+        # A deleted row comes back on the next load
+        deleted = sorted(loaded)[0]
+        conn.execute("DELETE FROM silver_fact_sales WHERE row_hash = ?", (deleted,))
+        conn.commit()
+        _load(conn, extract, monkeypatch, "2019-04-03T00:00:00+00:00")
+        assert _fact_hashes(conn) == loaded
+    finally:
+        conn.close()
+
+
+def test_delete_then_overlapping_extract_restores_row_and_adds_new(tmp_path, monkeypatch):
+    first = tmp_path / "first.csv"
+    overlap = tmp_path / "overlap.csv"
+    _write_csv(first, months=[1], cities=BRANCHES, start=0)
+    _write_csv(overlap, months=[1, 2], cities=BRANCHES, start=0)
+
+    conn = db.connect(tmp_path / "fact.sqlite")
+    try:
+        _load(conn, first, monkeypatch, "2019-04-01T00:00:00+00:00")
+        deleted = sorted(_fact_hashes(conn))[0]
+        conn.execute("DELETE FROM silver_fact_sales WHERE row_hash = ?", (deleted,))
+        conn.commit()
+
+        _load(conn, overlap, monkeypatch, "2019-04-02T00:00:00+00:00")
+        staged = {r[0] for r in db.fetch_all(conn, "SELECT row_hash FROM bronze_sales_raw")}
+        assert deleted in staged
+        assert _fact_hashes(conn) == staged
+    finally:
+        conn.close()